@@ -17,7 +17,7 @@ The name of these columns can be altered, but if one does so should also alter t
 values on settings.json.
 
 Usage:
-usage: nbudget.py [-h] [-w] [-t] [-c] [-i] [-d DATE] CONCEPT AMOUNT [TAG [TAG ...]]
+usage: nbudget.py [-h] [-w] [-t] [-r] [-c] [-i] [-d DATE] CONCEPT AMOUNT [TAG [TAG ...]]
 positional arguments:
   CONCEPT               The concept for the record.
   AMOUNT                The amount value for the record.
@@ -27,6 +27,8 @@ optional arguments:
   -h, --help            show this help message and exit
   -w, --wizard          Run the settings wizard and exit.
   -t, --tags            Output the current tag names in the database and exit.
+  -r, --refresh-tags    Fetch the tag names from the database instead of using the cached
+                        ones (see tags_cache_ttl in settings.json). Must come before -t.
   -c, --count           Output the current balance of the database and exit.
   -i, --income          Record is considered an INCOME instead of an EXPENSE.
   -d DATE, --date DATE  The date to use for the expense record, current day is used by default.
@@ -39,13 +41,32 @@ When using this script as an imported library, the user can get a default settin
 (This will not alter any existing settings.json file). Then he can pass the return dictionary of
 this function to create an instance of NBudgetController, through which the following methods are
 exposed:
+    * close() -> Closes the keep-alive connection to the API. The controller can also be used as a
+    context manager, which closes the connection on exit.
     * clear_tags_cache() -> We need the tag names for validating insert_record(), but we don't want
     to get the tags every time if we are inserting records iteratively, so we instead save a cache
     of them the first time. This methods allows for emptying this cache so we get the tags again.
+    If the controller was created with a tags_cache_file, the tags are also kept there for a while
+    so they are shared between runs (the terminal uses tags.cache.json on the scripts path), and
+    this method removes the file as well.
     * get_tags() -> Gets a list of the current tag's names.
-    * get_count() -> Gets the current balance of the buget database.
-    * insert_record(concept: str, amount: float, tags: list = None, income: str = 'OUT',
-                    date: str = None) -> Inserts a record.
+    * get_count(progress: callable = None) -> Gets the current balance of the buget database.
+    * insert_record(concept: str, amount: float, tags: list = None, income: bool = False,
+                    date: str = '', flush: bool = True, validate_tags: bool = True) -> Inserts
+    a record. With flush=False the record is buffered instead, until the next flush or the end of
+    the context manager. With validate_tags=False its tags are not checked before sending it.
+    * flush(progress: callable = None) -> Inserts the buffered records concurrently.
+    * insert_records(records: list, progress: callable = None, max_workers: int = 3) -> Inserts
+    several records concurrently, each record being a dict of insert_record() arguments, and
+    returns a list with None for each inserted record or the error that kept it from being inserted.
+
+Requests are throttled to Notion's limit of three per second, and rate limited or temporarily
+failed requests are retried. Page insertions are only retried when rate limited, so a record is
+never inserted twice. Connections go through the proxy in https_proxy, unless no_proxy excludes
+api.notion.com.
+
+For asyncio code, AsyncNBudgetController takes the same arguments and exposes the same methods as
+coroutines, running them in worker threads so they don't block the event loop.
 
 The settings.json file is structured as follows:
         'database_id':                - database_id
@@ -58,22 +79,59 @@ The settings.json file is structured as follows:
         'amount_name': 'Amount',      - Name of the Amount column in the Notion's database
         'tags_name': 'Tags'           - Name of the Tags column in the Notion's database
 
+Optionally, it can also have 'tags_cache_ttl' with the seconds controllers created with a
+tags_cache_file, like the terminal's, keep the tag names cached there (five minutes if missing).
+
 """
 import os
 import sys
-import argparse
 import json
+import time
 import datetime
-import urllib.request
-from copy import deepcopy
-from urllib.error import HTTPError
-from http.client import HTTPResponse
-from typing import Dict, List, Type
+import threading
+import functools
+from pathlib import Path
+from urllib.parse import urlsplit, unquote
+from email.message import Message
+from http.client import HTTPSConnection, RemoteDisconnected
+from typing import Callable, Dict, FrozenSet, Iterator, List, Optional, Tuple, Type
+
+try:  # orjson is optional, a faster codec for the API's JSON and for settings.json
+    from orjson import dumps as _dumps, loads as _loads, OPT_INDENT_2
+
+    def _dumps_indented(obj) -> bytes:
+        """ orjson.dumps, indented for files meant to be edited by hand """
+        return _dumps(obj, option=OPT_INDENT_2)
+except ImportError:
+    def _dumps(obj) -> bytes:
+        """ json.dumps, returning compact UTF-8 bytes like orjson.dumps does """
+        return json.dumps(obj, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    def _dumps_indented(obj) -> bytes:
+        """ json.dumps, returning indented UTF-8 bytes like orjson.dumps with OPT_INDENT_2 """
+        return json.dumps(obj, ensure_ascii=False, indent=2).encode('utf-8')
+
+    _loads = json.loads
 
 _PATH = os.path.dirname(os.path.abspath(__file__))
 
-_SETTINGS_KEY_VALIDATION = ['database_id', 'api_key', 'date_input_format', 'tag_separator',
-                            'type_name', 'date_name', 'concept_name', 'amount_name', 'tags_name']
+_TAGS_CACHE_FILE = 'tags.cache.json'
+
+_DEFAULT_SETTINGS = {
+    'date_input_format': 'D/M/Y',
+    'tag_separator': '\n',
+    'type_name': 'Type',
+    'date_name': 'Date',
+    'concept_name': 'Concept',
+    'amount_name': 'Amount',
+    'tags_name': 'Tags'
+}
+
+_SETTINGS_KEY_VALIDATION = ['database_id', 'api_key', *_DEFAULT_SETTINGS]
+_SETTINGS_KEYS = frozenset(_SETTINGS_KEY_VALIDATION)
+
+# Settings read by _read_settings() by full file path, along with the file's st_mtime_ns when read
+_SETTINGS_CACHE: Dict[str, Tuple[int, Dict[str, str]]] = {}
 
 
 def _err(error_msg: str) -> None:
@@ -94,39 +152,62 @@ def get_default_settings(database_id: str, api_key: str) -> Dict[str, str]:
     :returns: Dict[str, str], A default settings dictionary with the users information.
     :raises TypeError: if database_id or api_key are not string objects.
     """
-    if not isinstance(database_id, str):
-        raise TypeError(f'Expected str for database_id, got: {database_id}')
-    if not isinstance(api_key, str):
-        raise TypeError(f'Expected str for api_key, got: {database_id}')
-
-    return {
-        'database_id': database_id,
-        'api_key': api_key,
-        'date_input_format': 'D/M/Y',
-        'tag_separator': '\n',
-        'type_name': 'Type',
-        'date_name': 'Date',
-        'concept_name': 'Concept',
-        'amount_name': 'Amount',
-        'tags_name': 'Tags'
-    }
+    for name, value in (('database_id', database_id), ('api_key', api_key)):
+        if not isinstance(value, str):
+            raise TypeError(f'Expected str for {name}, got: {value!r}')
+
+    return {'database_id': database_id, 'api_key': api_key, **_DEFAULT_SETTINGS}
+
+
+class _RateLimiter:
+    """
+    Token bucket that lets through bursts of up to `tokens` requests and refills them at a rate of
+    `tokens` per `refill` seconds, making the callers of acquire() wait when it is empty.
+    """
+    def __init__(self, tokens: int = 3, refill: float = 1.0):
+        self.capacity: int = tokens
+        self.rate: float = tokens / refill
+        self._tokens: float = tokens
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """ Take a token, sleeping until one is available if the bucket is empty """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            self._tokens -= 1  # May go negative, which books a token for a waiting caller
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
 
 
 class NBudgetController:
     """
     Controller class for budget databases on Notion
     """
+    _API_HOST = 'api.notion.com'
+    _MAX_WORKERS = 3  # Notion allows an average of three requests per second
+    _BATCH_SIZE = 100  # Records insert_records() sends before queueing more
+    _MAX_RETRIES = 3
+    _RETRY_BACKOFF = 1.0  # Seconds before the first retry, doubled on each following one
+    _RETRY_STATUSES = (429, 502, 503, 504)
+    # Page insertions are not idempotent: a gateway error may come after the page was created,
+    # so they are only retried when rate limited, which means the request was turned down
+    _INSERTION_RETRY_STATUSES = (429,)
+    _TAGS_CACHE_TTL = 300  # Seconds the tags cached on disk are considered fresh
     _DATABASE_QUERY = 'https://api.notion.com/v1/databases/%s'
     _PAGE_INSERTION_QUERY = 'https://api.notion.com/v1/pages'
     _DATABASE_CONTENTS_QUERY = 'https://api.notion.com/v1/databases/%s/query'
     _HEADERS = {
         "User-Agent": "",  # Notion is using cloudflare to filter python-urllib's UA
         "Content-Type": "application/json",
-        "Authorization": "Bearer %s",
         "Notion-Version": "2021-05-13"
     }
 
-    def __init__(self, settings: Dict[str, str], raises: bool = True):
+    def __init__(self, settings: Dict[str, str], raises: bool = True,
+                 tags_cache_file: str = None):
         """
         Controller class for budget databases on Notion.
 
@@ -134,21 +215,107 @@ class NBudgetController:
         :param raises: bool, When we run the script via terminal we want the errors to be printed
         into the terminal, when the script is being ran as a module, we want to raise our errors
         instead. By default we raise.
+        :param tags_cache_file: str, path of a file where get_tags() keeps the tags for the
+        settings' optional 'tags_cache_ttl' seconds (_TAGS_CACHE_TTL if missing), so they survive
+        between runs of the script. None by default, which keeps them in memory only.
         """
         self.settings: Dict[str, str] = settings
         self.raises: bool = raises
         self.tags_cache: List[str] = []
+        self.tags_cache_file: str = tags_cache_file
+        self._tags_from_file = False  # Whether self.tags_cache came from self.tags_cache_file
+        self._idle_connections: List[HTTPSConnection] = []
+        self._connections_lock = threading.Lock()
+        self._rate_limiter = _RateLimiter()
+        self._date_parsers: Dict[str, Callable[[str], datetime.date]] = {}
+        self._pending: List[dict] = []
 
         self.page_insertion_query = NBudgetController._PAGE_INSERTION_QUERY
         self.database_query_url = NBudgetController._DATABASE_QUERY % self.settings['database_id']
         self.database_contents_query = NBudgetController._DATABASE_CONTENTS_QUERY \
                                        % self.settings['database_id']
-        self.headers = deepcopy(NBudgetController._HEADERS)
-        self.headers['Authorization'] = self.headers['Authorization'] % self.settings['api_key']
+        # Request paths on _API_HOST, parsed once instead of on every _api_call()
+        self._paths: Dict[str, str] = {
+            url: urlsplit(url).path for url in (self.page_insertion_query,
+                                                self.database_query_url,
+                                                self.database_contents_query)}
+        # Invariants of every page insertion, as the column names come from the settings
+        self._page_skeleton = {"parent": {"database_id": self.settings['database_id']}}
+        self._columns: Tuple[str, str, str, str, str] = (
+            self.settings['type_name'], self.settings['date_name'], self.settings['concept_name'],
+            self.settings['amount_name'], self.settings['tags_name'])
+        self.headers = {**NBudgetController._HEADERS,
+                        'Authorization': f'Bearer {self.settings["api_key"]}'}
 
     def clear_tags_cache(self) -> None:
-        """ Empty self.tags_cache """
+        """ Empty self.tags_cache and remove self.tags_cache_file, if any """
         self.tags_cache = []
+        self._tags_from_file = False
+        if self.tags_cache_file:
+            try:
+                os.remove(self.tags_cache_file)
+            except FileNotFoundError:
+                pass
+
+    def _read_tags_cache(self) -> Optional[List[str]]:
+        """
+        :return: List[str], Tag names in self.tags_cache_file, or None if there is no cache file,
+        it is stale, not understood, or it belongs to another database or tags column.
+        """
+        if not self.tags_cache_file:
+            return None
+        try:
+            cache = _loads(Path(self.tags_cache_file).read_bytes())
+        except (OSError, ValueError):
+            return None
+
+        # The cache file is only an optimization, anything unexpected in it means refetching
+        if not isinstance(cache, dict) or not isinstance(cache.get('fetched_at'), (int, float)) \
+                or not isinstance(cache.get('tags'), list):
+            return None
+        if cache.get('database_id') != self.settings['database_id'] \
+                or cache.get('tags_name') != self.settings['tags_name'] \
+                or time.time() - cache['fetched_at'] >= self.settings.get(
+                    'tags_cache_ttl', NBudgetController._TAGS_CACHE_TTL):
+            return None
+        return cache['tags']
+
+    def _write_tags_cache(self, tags: List[str]) -> None:
+        """
+        Write the tags into self.tags_cache_file, if any. The file is replaced atomically so a
+        concurrent run never reads it half-written. Failing to write it is not an error.
+
+        :param tags: List[str], Tag names
+        """
+        if not self.tags_cache_file:
+            return
+        cache = {'fetched_at': time.time(), 'database_id': self.settings['database_id'],
+                 'tags_name': self.settings['tags_name'], 'tags': tags}
+        import tempfile  # Only needed when refreshing the cache file, so imported lazily
+        try:
+            with tempfile.NamedTemporaryFile('wb', delete=False, suffix='.tmp',
+                                             dir=os.path.dirname(self.tags_cache_file) or '.') \
+                    as cache_file:
+                cache_file.write(_dumps(cache))
+            os.replace(cache_file.name, self.tags_cache_file)
+        except OSError:  # The cache file is only an optimization, carry on without it
+            pass
+
+    def close(self) -> None:
+        """ Close the idle keep-alive connections to the API """
+        with self._connections_lock:
+            while self._idle_connections:
+                self._idle_connections.pop().close()
+
+    def __enter__(self) -> 'NBudgetController':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if exc_type is None:
+                self.flush()
+        finally:
+            self.close()
 
     def _wrap_error(self, error_msg: str, exception: Type[Exception]):
         """
@@ -160,116 +327,274 @@ class NBudgetController:
             raise exception(error_msg)
         _err(f'{exception.__name__}: {error_msg}')
 
-    def _api_call(self, url, headers, data=None) -> dict:
+    @staticmethod
+    def _connect() -> HTTPSConnection:
+        """
+        Open a connection to the API. Like urllib, it goes through the proxy in https_proxy or
+        HTTPS_PROXY if the environment has one and no_proxy doesn't exclude _API_HOST.
+
+        :return: HTTPSConnection, to _API_HOST or tunnelled to it through the proxy
         """
-        :param url: str, url to call
+        # Only needed when a new connection is opened, so imported lazily
+        from urllib.request import getproxies, proxy_bypass
+
+        proxy = getproxies().get('https')
+        if not proxy or proxy_bypass(NBudgetController._API_HOST):
+            return HTTPSConnection(NBudgetController._API_HOST)
+
+        proxy_url = urlsplit(proxy if '://' in proxy else f'http://{proxy}')
+        tunnel_headers = {}
+        if proxy_url.username:
+            import base64
+            credentials = f'{unquote(proxy_url.username)}:{unquote(proxy_url.password or "")}'
+            tunnel_headers['Proxy-Authorization'] = \
+                f'Basic {base64.b64encode(credentials.encode()).decode()}'
+        connection = HTTPSConnection(proxy_url.hostname, proxy_url.port)
+        connection.set_tunnel(NBudgetController._API_HOST, headers=tunnel_headers)
+        return connection
+
+    def _request(self, method: str, path: str, headers: dict, data: bytes = None,
+                 idempotent: bool = True) -> Tuple[int, Message, bytes]:
+        """
+        Send a request through an idle keep-alive connection to the API, opening a new one if
+        there is none (e.g. when requests are being sent from several threads).
+
+        Notion may drop an idle connection between our calls, in which case the request is sent
+        once more through a fresh connection. Requests that are not idempotent are only sent again
+        if the connection was lost before the request went out, as otherwise Notion may have
+        already acted on it.
+
+        :param method: str, HTTP method to use
+        :param path: str, path of the API endpoint
         :param headers: dict, headers to use
         :param data: bytes-encoded string, data for the request, if any.
+        :param idempotent: bool, whether sending the request twice is harmless. True by default.
+        :return: Tuple[int, Message, bytes], status code, headers and body of the response. The body
+        of error responses that are not JSON is left unread and returned empty.
+        """
+        with self._connections_lock:
+            connection = self._idle_connections.pop() if self._idle_connections else None
+        reused, sent = connection is not None, False
+        if not reused:
+            connection = self._connect()
+        try:
+            connection.request(method, path, body=data, headers=headers)
+            sent = True
+            response = connection.getresponse()
+            if response.status >= 400 \
+                    and 'json' not in response.headers.get('Content-Type', ''):
+                # Not an error from the API but e.g. a Cloudflare HTML page. Rather than reading
+                # a body we have no use for, drop the connection it would be left pending on.
+                connection.close()
+                return response.status, response.headers, b''
+            result = response.status, response.headers, response.read()
+        except (RemoteDisconnected, ConnectionError):
+            connection.close()
+            if not reused or (sent and not idempotent):
+                raise
+            return self._request(method, path, headers, data, idempotent)
+        except BaseException:
+            connection.close()
+            raise
+
+        with self._connections_lock:
+            self._idle_connections.append(connection)
+        return result
+
+    @staticmethod
+    def _retry_delay(attempt: int, response_headers: Message) -> float:
+        """
+        :param attempt: int, number of the attempt that failed, starting at 0
+        :param response_headers: Message, headers of the failed response
+        :return: float, seconds to wait before retrying
+        """
+        try:
+            return float(response_headers.get('Retry-After'))
+        except (TypeError, ValueError):  # Missing, or an HTTP-date we don't bother parsing
+            return NBudgetController._RETRY_BACKOFF * 2 ** attempt
+
+    def _api_call(self, url, *, json_body: dict = None) -> dict:
+        """
+        :param url: str, url to call, which must be on _API_HOST
+        :param json_body: dict, data for the request, if any. It is sent JSON-encoded as a POST.
         :return: dict, json response from the API
         :raises APIError, if the request went right but the API returned an error
         :raises HTTPError, if the request went wrong
+        :raises ValueError, if url is not on _API_HOST
+
+        Requests that were rate limited (429) or hit a temporary server error are retried up to
+        _MAX_RETRIES times, waiting as much as Notion asks through Retry-After, or backing off
+        exponentially otherwise. Page insertions are only retried when rate limited, so that a
+        page is never created twice.
         """
-        request_object = urllib.request.Request(url, headers=headers, data=data)
-        try:
-            response: HTTPResponse = urllib.request.urlopen(request_object)
-        except HTTPError as exception:
-            try:
-                # If the error is from the API it comes back as JSON, attempt decoding to determine
-                err_json = json.loads(exception.read())
-                return self._wrap_error(f'{err_json["code"]} -> {err_json["message"]}',
-                                        self.APIError)
-            except json.decoder.JSONDecodeError:
-                if exception.code == 403:  # This can happen if the UA is using python-urllib
-                    return self._wrap_error(f'{exception.code} -> Check your UA if you have '
-                                            f'modified the script', self.HTTPError)
-
-                return self._wrap_error(str(exception.code), self.HTTPError)
-        else:
-            return json.loads(response.read())
+        method, body, headers = 'GET', None, self.headers
+        if json_body is not None:
+            method, body = 'POST', _dumps(json_body)
+            headers = {**self.headers, 'Content-Length': str(len(body))}
+        path = self._paths.get(url)
+        if path is None:
+            split_url = urlsplit(url)
+            if split_url.hostname != NBudgetController._API_HOST:
+                raise ValueError(f'Not a url of the Notion API: {url}')
+            path = f'{split_url.path}?{split_url.query}' if split_url.query else split_url.path
+        idempotent = url != self.page_insertion_query
+        retry_statuses = NBudgetController._RETRY_STATUSES if idempotent \
+            else NBudgetController._INSERTION_RETRY_STATUSES
+        for attempt in range(NBudgetController._MAX_RETRIES + 1):
+            self._rate_limiter.acquire()
+            status, response_headers, response_body = self._request(method, path, headers, body,
+                                                                    idempotent)
+            if status not in retry_statuses \
+                    or attempt == NBudgetController._MAX_RETRIES:
+                break
+            time.sleep(self._retry_delay(attempt, response_headers))
+
+        if status >= 400:
+            # If the error is from the API it comes back as JSON
+            if 'json' in response_headers.get('Content-Type', ''):
+                try:
+                    err_json = _loads(response_body)
+                    error_msg = f'{err_json["code"]} -> {err_json["message"]}'
+                except (ValueError, KeyError, TypeError):
+                    pass  # Not an error from the API after all, e.g. from a gateway
+                else:
+                    return self._wrap_error(error_msg, self.APIError)
+
+            if status == 403:  # This can happen if the UA is using python-urllib
+                return self._wrap_error(f'{status} -> Check your UA if you have '
+                                        f'modified the script', self.HTTPError)
+
+            return self._wrap_error(str(status), self.HTTPError)
+
+        return _loads(response_body)
 
     def get_tags(self) -> List[str]:
         """
         Get the tags from the Notion's database. Fills self.tags_cache and returns them.
 
+        If self.tags_cache_file holds fresh tags for this database they are used instead of
+        calling the API, otherwise the file is refreshed with the tags fetched.
+
         :return: List[str], Tag names
         :raises APIParsingError: if there were errors when attempting to parse the API response
         """
-        response = self._api_call(self.database_query_url, self.headers)
+        cached = self._read_tags_cache()
+        if cached is not None:
+            self.tags_cache = cached
+            self._tags_from_file = True
+            return cached
+
+        response = self._api_call(self.database_query_url)
         tags_column_name = self.settings['tags_name']
 
-        try:  # Check for response structure first
-            properties = response['properties']
-        except KeyError:
+        properties = response.get('properties')
+        if properties is None:  # Check for response structure first
             return self._wrap_error(f'Did not understand API response: {response}',
                                     self.APIParsingError)
 
-        try:
-            options = [o['name'] for o in properties[tags_column_name]['multi_select']['options']]
-            self.tags_cache = options
-            return options
-
-        except KeyError as exception:
-            if exception.args[0] == tags_column_name:
-                # Detect if there is other columns with multi_select type
-                multi_selects = [key for key in properties if 'multi_select' in properties[key]]
-                if len(multi_selects) >= 1:
-                    return self._wrap_error(f'Column with name "{tags_column_name}" does not exist '
-                                            f'in the Notion database. Could it be one of these: '
-                                            f'{", ".join(multi_selects)}? If one is then change '
-                                            f'"tag_name" in the settings file for it.',
-                                            self.APIParsingError)
-
-                return self._wrap_error('No multi_select type column found in Notion database.',
+        column = properties.get(tags_column_name)
+        if column is None:
+            # Detect if there is other columns with multi_select type
+            multi_selects = [key for key, value in properties.items() if 'multi_select' in value]
+            if multi_selects:
+                return self._wrap_error(f'Column with name "{tags_column_name}" does not exist '
+                                        f'in the Notion database. Could it be one of these: '
+                                        f'{", ".join(multi_selects)}? If one is then change '
+                                        f'"tag_name" in the settings file for it.',
                                         self.APIParsingError)
 
-            # Wrong column type for tags_column_name
-            wrong_type = next(iter(properties[tags_column_name]))
+            return self._wrap_error('No multi_select type column found in Notion database.',
+                                    self.APIParsingError)
+
+        multi_select = column.get('multi_select')
+        if multi_select is None:  # Wrong column type for tags_column_name
+            wrong_type = next(iter(column), None)
             return self._wrap_error(f'Type of the {tags_column_name} column is: "{wrong_type}".'
                                     f' Must be "multi_select"', self.APIParsingError)
 
-    def get_count(self) -> int:
+        options = [o['name'] for o in multi_select.get('options', [])]
+        self.tags_cache = options
+        self._tags_from_file = False
+        self._write_tags_cache(options)
+        return options
+
+    def _iter_pages(self, url: str, data: dict) -> Iterator[dict]:
+        """
+        Yield every page of a paginated query. The request for the next page is sent as soon as
+        a page arrives, so it travels while the caller is processing the current one.
+
+        :param url: str, url of the paginated endpoint
+        :param data: dict, data for the first request
+        :return: Iterator[dict], json responses from the API
+        """
+        # Imported here, like the one in _post_pages(), as importing concurrent.futures (and the
+        # logging package it pulls in) is most of the import time of nbudget otherwise
+        from concurrent.futures import ThreadPoolExecutor
+
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            response = self._api_call(url, json_body=data)
+            while True:
+                next_page = None
+                if response['next_cursor']:
+                    data = {**data, 'start_cursor': response['next_cursor']}
+                    next_page = executor.submit(self._api_call, url, json_body=data)
+
+                yield response
+
+                if next_page is None:
+                    return
+                response = next_page.result()
+
+    def get_count(self, progress: Callable[[int], None] = None) -> int:
         """
         Get the current balance from the Notion's database.
 
+        :param progress: Callable[[int], None], called with the number of records counted so far
+        after each page. None by default.
         :return: int, budget database balance
         """
-        # TODO: Refactor this
-        data = {'page_size': 100}
-        encoded_data = str(data).replace("'", '"').encode() # Encode data for urllib
-        response = self._api_call(self.database_contents_query, self.headers, encoded_data)
+        amount_key = self.settings['amount_name']
         total_sum = 0
-        for r in response['results']:
-            try:
-                total_sum += r['properties'][self.settings['amount_name']]['number']
-            except KeyError as c:
-                pass
-
-        while response['next_cursor']:
-            next_cursor = response['next_cursor']
-            data['start_cursor'] = next_cursor
-            encoded_data = str(data).replace("'", '"').encode()  # Encode data for urllib
-            response = self._api_call(self.database_contents_query, self.headers, encoded_data)
+        counted = 0
+        for response in self._iter_pages(self.database_contents_query, {'page_size': 100}):
+            # Records without properties or without an amount count as 0
             for r in response['results']:
-                try:
-                    total_sum += r['properties'][self.settings['amount_name']]['number']
-                except KeyError as c:
-                    pass
+                properties = r.get('properties')
+                column = properties.get(amount_key) if properties else None
+                value = column.get('number') if column else None
+                if value is not None:
+                    total_sum += value
+            if progress:
+                counted += len(response['results'])
+                progress(counted)
 
         return total_sum
 
     def insert_record(self, concept: str, amount: float, tags: List[str] = None,
-                      income: bool = False, date: str = '') -> None:
+                      income: bool = False, date: str = '', flush: bool = True,
+                      validate_tags: bool = True) -> None:
         """
         Transforms the arguments into valid page insertion data for the API and calls it.
 
         It calls self.get_tags() if self.tags_cache is empty in order to be able to validate the
-        tags the user is attempting to pass into the database.
+        tags the user is attempting to pass into the database. Tags read from self.tags_cache_file
+        are fetched again if they lack any of them, in case they were created since.
+
+        With flush=False the record is only validated and buffered, to be inserted along with the
+        rest of the buffered records by the next self.flush() or insert_record() with flush=True,
+        or when leaving the controller's context manager.
 
         :param concept: str, the record's concept
         :param amount: float, the record's amount
         :param tags: List[str], the record's tags. Empty by default.
         :param income: bool, if the record is an INCOME type. False by default.
         :param date: str, the record's date. None by default, which will use today's date.
+        :param flush: bool, if the record, and any buffered ones, are inserted right away. True by
+        default.
+        :param validate_tags: bool, if tags are checked against the database's tags. True by
+        default. Callers that already validated them can pass False to skip the check, and the
+        self.get_tags() request it may need, trading it for an APIError from Notion if a tag is
+        wrong after all.
         :return: None
         :raises InvalidTag: If the user attempted to use a tag that did not exist in Notion's db
         :raises APIError, if the request went right but the API returned an error
@@ -287,42 +612,194 @@ class NBudgetController:
         :raises HTTPError, if a request went wrong
         :raises APIParsingError: if there were errors when attempting to parse the Tags API response
         """
-        # Date parsing
-        if date:
-            date_object = self._format_date(date, self.settings['date_input_format'])
-        else:
-            today = datetime.datetime.today()
-            date_object = datetime.date(today.year, today.month, today.day)  # Get rid of time
-        iso_date = date_object.isoformat()  # Notion uses ISO 8601 Format
+        page = self._build_page(concept, amount, tags, income, date, validate_tags)
+        if flush and not self._pending:
+            self._post_page(page)
+            return
+
+        self._pending.append(page)
+        if flush:
+            self.flush()
+
+    def flush(self, progress: Callable[[int, int], None] = None) -> None:
+        """
+        Insert the records buffered by insert_record(..., flush=False), concurrently as
+        insert_records() does. The buffer is emptied before sending them, and all of them are
+        sent even if some fail.
+
+        :param progress: Callable[[int, int], None], see insert_records(). None by default.
+        :return: None
+        :raises APIError, if a request went right but the API returned an error
+        :raises HTTPError, if a request went wrong
+        """
+        pages, self._pending = self._pending, []
+        for error in self._post_pages(pages, NBudgetController._MAX_WORKERS, progress):
+            if error is not None:
+                raise error
+
+    def insert_records(self, records: List[dict], progress: Callable[[int, int], None] = None,
+                       max_workers: int = _MAX_WORKERS) -> List[Optional[Exception]]:
+        """
+        Insert several records concurrently, using up to max_workers requests at a time.
+
+        The tags are fetched once beforehand if any record has tags and self.tags_cache is empty,
+        and every record is validated before any of them is sent, so an invalid record doesn't
+        leave the batch half inserted. Records are then sent _BATCH_SIZE at a time, and a record
+        the API fails to insert doesn't stop the rest: its error is returned instead.
+
+        :param records: List[dict], keyword arguments for insert_record(), one dict per record
+        :param progress: Callable[[int, int], None], called with the number of records inserted so
+        far and the total number of records after each insertion. None by default.
+        :param max_workers: int, maximum number of concurrent requests. _MAX_WORKERS by default,
+        as requests are throttled to three per second anyway.
+        :return: List[Optional[Exception]], for each record, None if it was inserted or the
+        APIError, HTTPError or OSError raised when inserting it
+
+        Lets all self._build_page() exceptions escalate, so see insert_record() for them.
+        """
+        valid_tags = None
+        tags = [tag for record in records if record.get('validate_tags', True)
+                for tag in record.get('tags') or ()]
+        if tags:
+            valid_tags = self._valid_tags(tags)
+        pages = [self._build_page(**record, valid_tags=valid_tags) for record in records]
+        return self._post_pages(pages, max_workers, progress)
+
+    def _post_pages(self, pages: List[dict], max_workers: int,
+                    progress: Callable[[int, int], None] = None) -> List[Optional[Exception]]:
+        """
+        Send several page insertions concurrently, using up to max_workers requests at a time
+        and _BATCH_SIZE pages per batch.
+
+        :param pages: List[dict], page insertion data, as returned by self._build_page()
+        :param max_workers: int, maximum number of concurrent requests
+        :param progress: Callable[[int, int], None], see insert_records(). None by default.
+        :return: List[Optional[Exception]], for each page, None or the error raised when sending it
+        """
+        errors: List[Optional[Exception]] = []
+        if not pages:
+            return errors
+
+        from concurrent.futures import ThreadPoolExecutor  # See _iter_pages()
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            for start in range(0, len(pages), NBudgetController._BATCH_SIZE):
+                batch = pages[start:start + NBudgetController._BATCH_SIZE]
+                for error in executor.map(self._try_post_page, batch):
+                    errors.append(error)
+                    if progress:
+                        progress(len(errors), len(pages))
+        return errors
+
+    def _try_post_page(self, page: dict) -> Optional[Exception]:
+        """
+        :param page: dict, page insertion data
+        :return: Optional[Exception], None if the page was inserted, or the APIError, HTTPError or
+        OSError (e.g. a lost connection) raised otherwise. Other exceptions are bugs, so they
+        escalate.
+        """
+        try:
+            self._post_page(page)
+        except (self.APIError, self.HTTPError, OSError) as exception:  # Reported to the caller
+            return exception
+        return None
+
+    def _valid_tags(self, tags: List[str]) -> FrozenSet[str]:
+        """
+        :param tags: List[str], tag names about to be validated
+        :return: FrozenSet[str], tag names to validate them against: self.tags_cache, calling
+        self.get_tags() if it is empty. If some of tags are missing from tags read from
+        self.tags_cache_file, which may predate them, the tags are fetched from the API once more.
+        """
+        valid_tags = frozenset(self.tags_cache if self.tags_cache else self.get_tags())
+        if self._tags_from_file and not valid_tags.issuperset(tags):
+            self.clear_tags_cache()
+            valid_tags = frozenset(self.get_tags())
+        return valid_tags
+
+    def _build_page(self, concept: str, amount: float, tags: List[str] = None,
+                    income: bool = False, date: str = '', validate_tags: bool = True,
+                    valid_tags: FrozenSet[str] = None) -> dict:
+        """
+        Transforms the arguments of insert_record() into valid page insertion data for the API.
+
+        :param valid_tags: FrozenSet[str], the tag names to validate tags against. None by default,
+        which uses self._valid_tags().
+        :return: dict, page insertion data
+        :raises InvalidTag: If the user attempted to use a tag that did not exist in Notion's db
+
+        See insert_record() for the rest of the arguments and the exceptions that escalate.
+        """
+        # Date parsing, Notion uses ISO 8601 Format
+        iso_date = self._format_date(date, self.settings['date_input_format']).isoformat() \
+            if date else datetime.date.today().isoformat()
 
         # Income parsing
         record_type = 'EXPENSE' if not income else 'INCOME'
         amount = -amount if not income else amount
 
         # First build
-        data: dict = {"parent": {"database_id": self.settings['database_id']},
-                      "properties": {self.settings['type_name']: {"select": {"name": record_type}},
-                                     self.settings['date_name']: {"date": {"start": iso_date}},
-                                     self.settings['concept_name']: {
-                                         "title": [{"text": {"content": concept}}]},
-                                     self.settings['amount_name']: {"number": amount}
+        type_name, date_name, concept_name, amount_name, tags_name = self._columns
+        data: dict = {**self._page_skeleton,
+                      "properties": {type_name: {"select": {"name": record_type}},
+                                     date_name: {"date": {"start": iso_date}},
+                                     concept_name: {"title": [{"text": {"content": concept}}]},
+                                     amount_name: {"number": amount}
                                      }
                       }
 
         # Validate tags
         if tags:
-            valid_options = self.tags_cache if self.tags_cache else self.get_tags()
-            for tag in tags:
-                if tag not in valid_options:
-                    self._wrap_error(f'Tag does not exist in Notion db: "{tag}", use one of these:'
-                                     f'{", ".join(valid_options)}', self.InvalidTag)
+            if validate_tags:
+                if valid_tags is None:
+                    valid_tags = self._valid_tags(tags)
+                invalid_tags = [tag for tag in tags if tag not in valid_tags]
+                if invalid_tags:
+                    quoted_tags = ', '.join(f'"{tag}"' for tag in invalid_tags)
+                    self._wrap_error(f'Tags do not exist in Notion db: {quoted_tags}, use one of '
+                                     f'these: {", ".join(sorted(valid_tags))}', self.InvalidTag)
 
             tags_list = [{"name": t} for t in tags]
-            data['properties'][self.settings['tags_name']] = {"multi_select": tags_list}
+            data['properties'][tags_name] = {"multi_select": tags_list}
+
+        return data
+
+    def _post_page(self, data: dict) -> None:
+        """
+        :param data: dict, page insertion data built by self._build_page()
+        :return: None
+        :raises APIError, if the request went right but the API returned an error
+        :raises HTTPError, if the request went wrong
+        """
+        self._api_call(self.page_insertion_query, json_body=data)
+
+    def _date_parser(self, date_input_format: str) -> Callable[[str], datetime.date]:
+        """
+        Build a parser for dates in date_input_format, with the positions of Y, M and D baked in.
+        It is built once per format and kept in self._date_parsers, as the format hardly ever
+        changes between calls.
+
+        :param date_input_format: str of format D/M/Y (D, M and Y separated by /)
+        :return: Callable[[str], datetime.date], that raises IndexError if there is a missing
+        value in the date and ValueError if either day, month, or year is beyond range
+        :raises InvalidDateFormat: If there is a missing key (D, M, Y) in date_input_format
+        """
+        parser = self._date_parsers.get(date_input_format)
+        if parser is None:
+            split_date_input_format = date_input_format.split('/')
+            try:
+                year_index, month_index, day_index = split_date_input_format.index('Y'), \
+                    split_date_input_format.index('M'), split_date_input_format.index('D')
+            except ValueError:  # Missing key in date_input_format
+                return self._wrap_error(date_input_format, self.InvalidDateFormat)
 
-        # TODO: Move this to self._api_call()
-        encoded_data = str(data).replace("'", '"').encode()  # Encode data for urllib
-        self._api_call(self.page_insertion_query, self.headers, encoded_data)
+            def parser(date: str) -> datetime.date:
+                split_date = date.split('/')
+                return datetime.date(int(split_date[year_index]), int(split_date[month_index]),
+                                     int(split_date[day_index]))
+
+            self._date_parsers[date_input_format] = parser
+        return parser
 
     def _format_date(self, date: str, date_input_format: str) -> datetime.date:
         """
@@ -338,23 +815,13 @@ class NBudgetController:
         :raises InvalidDate: If there is a missing value in date
         :raises InvalidDateRange: If either day, month, or year is beyond range
         """
-        # Split by /
-        split_date_input_format, split_date = date_input_format.split('/'), date.split('/')
-
-        # Use format positions as indexes for date positions
+        parser = self._date_parser(date_input_format)
         try:
-            year, month, day = split_date[split_date_input_format.index('Y')], \
-                               split_date[split_date_input_format.index('M')], \
-                               split_date[split_date_input_format.index('D')]
-        except ValueError:  # Missing key in date_input_format
-            return self._wrap_error(date_input_format, self.InvalidDateFormat)
+            return parser(date)
         except IndexError:  # Missing value in date
             return self._wrap_error(date, self.InvalidDate)
-        else:
-            try:
-                return datetime.date(int(year), int(month), int(day))
-            except ValueError:  # Either day, month, or year is beyond range
-                return self._wrap_error(date, self.InvalidDateRange)
+        except ValueError:  # Either day, month, or year is beyond range
+            return self._wrap_error(date, self.InvalidDateRange)
 
     class InvalidDateRange(Exception):
         """ The date is beyond range """
@@ -369,7 +836,7 @@ class NBudgetController:
         """ The API has returned an error """
 
     class HTTPError(Exception):
-        """ urllib has returned an HTTP error """
+        """ The API host has returned an HTTP error """
 
     class APIParsingError(Exception):
         """ get_tags() returned a structure the script can't work with """
@@ -378,18 +845,99 @@ class NBudgetController:
         """ Attempted to insert a Tag that didn't exist in Notion's db as an option """
 
 
+class AsyncNBudgetController:
+    """
+    asyncio interface for budget databases on Notion. It wraps an NBudgetController and awaits its
+    methods in the event loop's default executor, so they run concurrently with other coroutines
+    instead of blocking the loop.
+    """
+    def __init__(self, settings: Dict[str, str], raises: bool = True,
+                 tags_cache_file: str = None):
+        """
+        asyncio interface for budget databases on Notion.
+
+        :param settings: Dict[str, str], settings file
+        :param raises: bool, see NBudgetController.
+        :param tags_cache_file: str, see NBudgetController.
+        """
+        self.controller = NBudgetController(settings, raises, tags_cache_file)
+
+    async def __aenter__(self) -> 'AsyncNBudgetController':
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        try:
+            if exc_type is None:
+                await self.flush()
+        finally:
+            self.close()
+
+    def close(self) -> None:
+        """ Close the idle keep-alive connections to the API """
+        self.controller.close()
+
+    @staticmethod
+    async def _run(method: Callable, *args, **kwargs):
+        """
+        :param method: Callable, NBudgetController method to run in a worker thread
+        :return: whatever method returns
+        """
+        import asyncio  # Only needed by asyncio users, who have already imported it
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(method, *args, **kwargs))
+
+    async def get_tags(self) -> List[str]:
+        """ See NBudgetController.get_tags() """
+        return await self._run(self.controller.get_tags)
+
+    async def get_count(self, progress: Callable[[int], None] = None) -> int:
+        """ See NBudgetController.get_count() """
+        return await self._run(self.controller.get_count, progress)
+
+    async def insert_record(self, concept: str, amount: float, tags: List[str] = None,
+                            income: bool = False, date: str = '', flush: bool = True,
+                            validate_tags: bool = True) -> None:
+        """ See NBudgetController.insert_record() """
+        await self._run(self.controller.insert_record, concept, amount, tags, income, date, flush,
+                        validate_tags)
+
+    async def flush(self, progress: Callable[[int, int], None] = None) -> None:
+        """ See NBudgetController.flush() """
+        await self._run(self.controller.flush, progress)
+
+    async def insert_records(self, records: List[dict],
+                             progress: Callable[[int, int], None] = None,
+                             max_workers: int = NBudgetController._MAX_WORKERS
+                             ) -> List[Optional[Exception]]:
+        """ See NBudgetController.insert_records() """
+        return await self._run(self.controller.insert_records, records, progress, max_workers)
+
+
+def _clear_settings_cache() -> None:
+    """ Forget the settings read by _read_settings(), so they are read again from disk """
+    _SETTINGS_CACHE.clear()
+
+
 def _read_settings(*, filepath='settings.json') -> Dict[str, str]:
     """
     Reads and validates settings.json file on the scripts path using _SETTINGS_KEY_VALIDATION
     If the dictionary doesn't exist it calls _settings_wizard instead.
 
+    The result is cached per file path in _SETTINGS_CACHE along with the file's modification
+    time, so the file isn't read again until it changes. Every caller gets its own copy of the
+    settings, as they may alter them.
+
     :param filepath: str, just for the sake of not overwriting our own files when testing.
     :returns: Dict[str, str], settings object
     """
+    path = Path(f'{_PATH}/{filepath}')
     try:
-        with open(f'{_PATH}/{filepath}', 'r', encoding='utf-8') as settings_file:
-            settings = json.load(settings_file)
-        settings_file.close()
+        modified = path.stat().st_mtime_ns
+        cached = _SETTINGS_CACHE.get(str(path))
+        if cached is not None and cached[0] == modified:
+            return dict(cached[1])
+        data = path.read_bytes()
     except FileNotFoundError:
         answer = _choose_option('Settings file does not exist. Create one?', ['Y', 'N'])
         if answer == 'Y':
@@ -397,14 +945,36 @@ def _read_settings(*, filepath='settings.json') -> Dict[str, str]:
 
         _err(f'No {filepath} file.')
 
+    settings = _parse_settings(data)
+    _SETTINGS_CACHE[str(path)] = (modified, settings)
+    return dict(settings)
+
+
+def _parse_settings(data: bytes) -> Dict[str, str]:
+    """
+    Parses the contents of a settings.json file and validates them using _SETTINGS_KEY_VALIDATION,
+    along with the optional tags_cache_ttl
+
+    :param data: bytes, contents of the settings file
+    :returns: Dict[str, str], settings object
+    """
+    try:
+        settings = _loads(data)
     except json.decoder.JSONDecodeError as exception:
         _err(f'settings.json is malformed: {exception}\nConsider running the settings wizard by '
              f'using -w option.')
 
-    for key in _SETTINGS_KEY_VALIDATION:
-        if key not in settings.keys():
-            _err(f'settings.json file is missing key: "{key}"\nConsider running the settings_wizard'
-                 f'by using -w option.')
+    missing = _SETTINGS_KEYS.difference(settings)
+    if missing:
+        missing_keys = ', '.join(f'"{key}"' for key in _SETTINGS_KEY_VALIDATION if key in missing)
+        _err(f'settings.json file is missing keys: {missing_keys}\nConsider running the settings '
+             f'wizard by using -w option.')
+
+    tags_cache_ttl = settings.get('tags_cache_ttl', 0)
+    if not isinstance(tags_cache_ttl, (int, float)) or isinstance(tags_cache_ttl, bool) \
+            or tags_cache_ttl < 0:
+        _err(f'tags_cache_ttl in settings.json must be a number of seconds, got: '
+             f'{tags_cache_ttl!r}')
 
     return settings
 
@@ -420,9 +990,9 @@ def _settings_wizard(*, filepath='settings.json') -> Dict[str, str]:
     database_id = input('[>] Please enter the database_id of the Notion\'s budget database:')
     api_key = input('[>] Please enter the Notion\'s API key associated with this database_id:')
     settings = get_default_settings(database_id, api_key)
-    with open(f'{_PATH}/{filepath}', 'w', encoding='utf-8') as settings_file:
-        json.dump(settings, settings_file, indent=True)
-    settings_file.close()
+    with open(f'{_PATH}/{filepath}', 'wb') as settings_file:
+        settings_file.write(_dumps_indented(settings))
+    _clear_settings_cache()
     return settings
 
 
@@ -436,41 +1006,93 @@ def _choose_option(prompt: str, valid_options: List[str]) -> str:
     :return: str, option chosen
     """
     valid_options = [vo.upper() for vo in valid_options]
-    valid_response = False
-    response = ''
-    while not valid_response:
-        response = input(f'[>] {prompt} {valid_options}')
-        if response.upper() in valid_options:
-            valid_response = True
-    return response
-
-
-class GetTags(argparse.Action):
-    """ Creates an instance of NBudgetController and calls get_tags() """
-    def __call__(self, parser, namespace, values, option_string=None):
-        settings = _read_settings()
-        options = NBudgetController(settings, raises=False).get_tags()
-        print(settings['tag_separator'].join(options))
-        parser.exit()
-
-
-class GetCount(argparse.Action):
-    """ Creates an instance of NBudgetController and calls get_count() """
-    def __call__(self, parser, namespace, values, option_string=None):
-        settings = _read_settings()
-        count = NBudgetController(settings, raises=False).get_count()
-        print('$', count)
-        parser.exit()
-
-
-class RunWizard(argparse.Action):
-    """ Calls _settings_wizard() """
-    def __call__(self, parser, namespace, values, option_string=None):
-        _settings_wizard()
-        parser.exit()
+    valid_set = frozenset(valid_options)
+    prompt = f'[>] {prompt} {valid_options}'
+    while True:
+        response = input(prompt)
+        if response.upper() in valid_set:
+            return response
+
+
+@functools.lru_cache(maxsize=1)
+def _get_controller() -> NBudgetController:
+    """
+    The terminal's NBudgetController, created from settings.json the first time it is needed and
+    shared by every action afterwards, so they all use the same settings and connections.
+
+    :return: NBudgetController, that exits instead of raising
+    """
+    return NBudgetController(_read_settings(), raises=False,
+                             tags_cache_file=f'{_PATH}/{_TAGS_CACHE_FILE}')
+
+
+def _print_tags() -> None:
+    """ Prints the result of get_tags() of the terminal's NBudgetController """
+    controller = _get_controller()
+    separator = controller.settings['tag_separator'].encode('utf-8')
+    # Encoded once and written as bytes, skipping the text layer for long tag lists
+    sys.stdout.buffer.write(separator.join(tag.encode('utf-8') for tag in controller.get_tags())
+                            + b'\n')
+
+
+@functools.lru_cache(maxsize=None)
+def _cli_actions() -> Dict[str, type]:
+    """
+    Build the argparse actions used by the terminal interface. argparse is imported here, and
+    these classes created, only when they are first needed, so importing nbudget as a library
+    doesn't pay for them.
+
+    :return: Dict[str, type], argparse.Action subclasses by name
+    """
+    import argparse
+
+    class GetTags(argparse.Action):
+        """ Calls _print_tags() """
+        def __call__(self, parser, namespace, values, option_string=None):
+            _print_tags()
+            parser.exit()
+
+    class GetCount(argparse.Action):
+        """ Calls get_count() of the terminal's NBudgetController """
+        def __call__(self, parser, namespace, values, option_string=None):
+            print('$', _get_controller().get_count())
+            parser.exit()
+
+    class RefreshTags(argparse.Action):
+        """ Calls clear_tags_cache() of the terminal's NBudgetController """
+        def __call__(self, parser, namespace, values, option_string=None):
+            _get_controller().clear_tags_cache()
+
+    class RunWizard(argparse.Action):
+        """ Calls _settings_wizard() """
+        def __call__(self, parser, namespace, values, option_string=None):
+            _settings_wizard()
+            parser.exit()
+
+    return {'GetTags': GetTags, 'GetCount': GetCount, 'RefreshTags': RefreshTags,
+            'RunWizard': RunWizard}
+
+
+def __getattr__(name: str):
+    """ Expose the argparse actions built by _cli_actions() as module attributes (PEP 562) """
+    if name in ('GetTags', 'GetCount', 'RefreshTags', 'RunWizard'):
+        return _cli_actions()[name]
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
 
 if __name__ == '__main__':
+    # Fast paths for the lone -t and -w invocations, which don't need argparse at all
+    if sys.argv[1:] in (['-t'], ['--tags']):
+        _print_tags()
+        sys.exit()
+    if sys.argv[1:] in (['-w'], ['--wizard']):
+        _settings_wizard()
+        sys.exit()
+
+    import argparse
+
+    _ACTIONS = _cli_actions()
+
     _DESC = 'Interface for a simple budget database in Notion using Notion\'s API. The database ' \
             'needs to be structured as follows: Type(select) -> with two options: "INCOME" and ' \
             '"EXPENSE", Date(date), Concept(title), Amount(number) -> formatted as Dollars, ' \
@@ -481,11 +1103,18 @@ if __name__ == '__main__':
     argument_parser = argparse.ArgumentParser(description=_DESC)
 
     W_HELP = 'Run the settings wizard and exit.'
-    argument_parser.add_argument('-w', '--wizard', nargs=0, action=RunWizard, help=W_HELP)
+    argument_parser.add_argument('-w', '--wizard', nargs=0, action=_ACTIONS['RunWizard'],
+                                 help=W_HELP)
     T_HELP = 'Output the current tag names in the database and exit.'
-    argument_parser.add_argument('-t', '--tags', nargs=0, action=GetTags, help=T_HELP)
+    argument_parser.add_argument('-t', '--tags', nargs=0, action=_ACTIONS['GetTags'],
+                                 help=T_HELP)
+    R_HELP = 'Fetch the tag names from the database instead of using the cached ones (see ' \
+             'tags_cache_ttl in settings.json). Must come before -t.'
+    argument_parser.add_argument('-r', '--refresh-tags', nargs=0, action=_ACTIONS['RefreshTags'],
+                                 help=R_HELP)
     C_HELP = 'Output the current balance of the database and exit.'
-    argument_parser.add_argument('-c', '--count', nargs=0, action=GetCount, help=C_HELP)
+    argument_parser.add_argument('-c', '--count', nargs=0, action=_ACTIONS['GetCount'],
+                                 help=C_HELP)
 
     I_HELP = 'Record is considered an INCOME instead of an EXPENSE.'
     argument_parser.add_argument('-i', '--income', action='store_true', help=I_HELP)
@@ -499,7 +1128,7 @@ if __name__ == '__main__':
     argument_parser.add_argument('tags', metavar='TAG', type=str, nargs='*', help=TAG_HELP)
 
     parsed_arguments = argument_parser.parse_args()
-    NBC = NBudgetController(_read_settings(), raises=False)
+    NBC = _get_controller()
     NBC.insert_record(concept=parsed_arguments.concept[0],
                       amount=parsed_arguments.amount[0],
                       tags=parsed_arguments.tags,